@@ -1,49 +1,141 @@
 import streamlit as st
-import yaml, regex as re, json
-from typing import Dict, List
+import numpy as np
+import yaml, json, io, os, string, hashlib, warnings
+import re
+# stdlib re is faster for these patterns; the third-party `regex` engine stays available as an
+# opt-in. It is not in requirements.txt: install it separately to use it.
+if os.environ.get("AXIS_REGEX_ENGINE", "re") == "regex":
+    try:
+        import regex as re
+    except ImportError:
+        warnings.warn("AXIS_REGEX_ENGINE=regex but the `regex` package is not installed; using re")
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, List, Tuple
+try:
+    import ahocorasick  # pyahocorasick: linear-time literal matching for the alias dictionary
+except ImportError:
+    ahocorasick = None
+try:
+    import orjson  # serializes the export report straight to bytes
+except ImportError:
+    orjson = None
+
+def dump_json(obj) -> bytes:
+    # Indented JSON as bytes. orjson rejects strings that are not valid UTF-8 (lone
+    # surrogates); json.dumps with its default ASCII escaping writes anything, as it always did.
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+        except TypeError:
+            pass
+    return json.dumps(obj, indent=2).encode("utf-8")
 
 st.set_page_config(page_title="AXIS+Construct Assessor", layout="wide")
 st.title("🧪 AXIS-style Appraisal + Construct Addendum")
 
 # ---------------- PDF text extraction ----------------
-def extract_text(file) -> str:
+# AXIS_PDF_EXTRACTOR=pypdf skips PyMuPDF entirely; the default tries PyMuPDF first
+PDF_EXTRACTORS = ("pymupdf", "pypdf")
+PDF_EXTRACTOR = os.environ.get("AXIS_PDF_EXTRACTOR", "pymupdf")
+if PDF_EXTRACTOR not in PDF_EXTRACTORS:
+    warnings.warn(f"unknown AXIS_PDF_EXTRACTOR={PDF_EXTRACTOR!r} (expected one of {', '.join(PDF_EXTRACTORS)}); using pymupdf")
+    PDF_EXTRACTOR = "pymupdf"
+
+def _extract_fitz(data: bytes) -> str:
+    import fitz
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return "\n".join([p.get_text("text") for p in doc])
+
+def _extract_pypdf(data: bytes) -> str:
+    from pypdf import PdfReader
+    r = PdfReader(io.BytesIO(data))
+    chunks = []
+    for p in r.pages:
+        try:
+            t = p.extract_text()
+            if t: chunks.append(t)
+        except: pass
+    return "\n".join(chunks)
+
+def extract_text(data: bytes) -> str:
     # Prefer PyMuPDF for cleaner text; fallback to pypdf
-    try:
-        import fitz
-        doc = fitz.open(stream=file.read(), filetype="pdf")
-        text = "\n".join([p.get_text("text") for p in doc])
-        return text
-    except Exception:
-        file.seek(0)
-        from pypdf import PdfReader
-        r = PdfReader(file)
-        chunks = []
-        for p in r.pages:
-            try:
-                t = p.extract_text()
-                if t: chunks.append(t)
-            except: pass
-        return "\n".join(chunks)
+    if PDF_EXTRACTOR != "pypdf":
+        try:
+            return _extract_fitz(data)
+        except Exception:
+            pass
+    return _extract_pypdf(data)
 
 # ---------------- utilities ----------------
-SPLIT = re.compile(r'(?<=\.)\s+(?=[A-Z\(])|(?<=[!?])\s+')
 SECTION_HEAD = re.compile(r'\b(Abstract|Introduction|Background|Theory|Method|Methods|Measures?|Participants?|Procedure|Results?|Discussion|Conclusion|Funding|Acknowledgements|Ethics)\b', re.I)
 
-def sentences(text: str) -> List[str]:
-    clean = re.sub(r'\s+', ' ', text)
-    return [s.strip() for s in SPLIT.split(clean) if s.strip()]
+def sentence_breaks(clean: str) -> np.ndarray:
+    # Offsets of the single spaces that end a sentence in whitespace-normalized text:
+    # ". " followed by a capital or "(", or "! " / "? ". Vectorized over the code points
+    # (UTF-32 keeps one array slot per character, so offsets index `clean` directly;
+    # surrogatepass lets lone surrogates from PDF extraction through as one slot each).
+    cp = np.frombuffer(clean.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    cp = np.concatenate(([0], cp, [0]))  # pad so every real position has both neighbours
+    prev, cur, nxt = cp[:-2], cp[1:-1], cp[2:]
+    after_dot = (prev == ord(".")) & (((nxt >= ord("A")) & (nxt <= ord("Z"))) | (nxt == ord("(")))
+    after_bang = (prev == ord("!")) | (prev == ord("?"))
+    return np.flatnonzero((cur == ord(" ")) & (after_dot | after_bang))
+
+WHITESPACE = re.compile(r'\s+')
+
+def normalize(text: str) -> str:
+    # collapse whitespace runs to single spaces; done once per section when a paper is analyzed
+    return WHITESPACE.sub(' ', text)
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+@lru_cache(maxsize=64)
+def fold(text: str) -> str:
+    # lowercase once so patterns can skip re.I; offsets must stay aligned with `text`,
+    # so fall back to ASCII-only folding if full lowercasing changes the length
+    low = text.lower()
+    return low if len(low) == len(text) else text.translate(_ASCII_LOWER)
+
+@lru_cache(maxsize=64)
+def segment(clean: str) -> Tuple[str, Tuple[int, ...], Tuple[int, ...], Tuple[str, ...]]:
+    # memoized: every pattern probe over the same section text reuses one split.
+    # Expects normalize()d text; returns it folded, sentence start/end offsets into it,
+    # and the sentences themselves (original case).
+    starts, ends, sents = [], [], []
+    pos = 0
+    for stop in list(sentence_breaks(clean)) + [len(clean)]:
+        piece = clean[pos:stop]
+        s = piece.strip()
+        if s:
+            begin = pos + len(piece) - len(piece.lstrip())
+            starts.append(begin)
+            ends.append(begin + len(s))
+            sents.append(s)
+        pos = stop + 1
+    return fold(clean), tuple(starts), tuple(ends), tuple(sents)
+
+def sentences(text: str) -> Tuple[str, ...]:
+    return segment(text)[3]
 
 def sectionize(text: str) -> Dict[str,str]:
-    secs = {}
-    current = "Full Text"
-    secs[current] = []
-    for line in text.splitlines():
-        m = SECTION_HEAD.search(line.strip())
-        if m:
-            current = m.group(0).title()
-            secs.setdefault(current, [])
-        secs[current].append(line)
-    return {k: "\n".join(v) for k,v in secs.items()}
+    # one SECTION_HEAD sweep over the whole text. As with the line scan it replaces, the first
+    # heading word on a line starts that section at the line, and repeated headings accumulate.
+    secs = {"Full Text": text}
+    cuts = []
+    line_end = -1
+    for m in SECTION_HEAD.finditer(text):
+        if m.start() < line_end:
+            continue
+        line_end = text.find("\n", m.end())
+        line_end = len(text) if line_end < 0 else line_end
+        cuts.append((text.rfind("\n", 0, m.start()) + 1, m.group(0).title()))
+    chunks = {}
+    for (start, name), (stop, _) in zip(cuts, cuts[1:] + [(len(text), None)]):
+        chunks.setdefault(name, []).append(text[start:stop])
+    secs.update({k: "".join(v) for k,v in chunks.items()})
+    return secs
 
 # ---------------- load configuration ----------------
 @st.cache_data
@@ -55,34 +147,164 @@ AXIS = load_yaml("axis.yaml")
 KB   = load_yaml("constructs.yaml")
 
 # ---------------- pattern banks ----------------
-RE_DEF      = re.compile(r'\b(defined as|we define|is defined as|refers to)\b', re.I)
-RE_BOUNDARY = re.compile(r'\b(distinct from|differs from|as opposed to|not merely|boundary|scope conditions?)\b', re.I)
-RE_THEORY   = re.compile(r'\b(model|mechanism|dual[\s-]?systems?|process model|expected value of control|valuation|control theory)\b', re.I)
-RE_VALIDITY = re.compile(r'\b(convergent|discriminant|criterion|predictive|known[- ]groups|response[- ]process|factor validity)\b', re.I)
-RE_RELIAB   = re.compile(r'\b(alpha|cronbach|omega|test[- ]?retest|ICC)\b', re.I)
-RE_DESIGN   = re.compile(r'\b(randomi[sz]ed|experiment|intervention|longitudinal|cross[- ]sectional|pre[- ]post|RCT)\b', re.I)
-RE_FUND     = re.compile(r'\bfund(ing|ed)|grant|sponsor|conflict of interest|COI\b', re.I)
-RE_ETHICS   = re.compile(r'\b(IRB|ethic(al)? committee|approved|consent)\b', re.I)
+# all scoring patterns are lowercase and case-sensitive: they run over fold()ed text.
+# Uploaded text cannot make re backtrack badly here: every pattern (SECTION_HEAD too) is a flat
+# alternation of literals and single-character classes with no nested quantifiers, so
+# matching stays linear in the input.
+RE_DEF      = re.compile(r'\b(defined as|we define|is defined as|refers to)\b')
+RE_BOUNDARY = re.compile(r'\b(distinct from|differs from|as opposed to|not merely|boundary|scope conditions?)\b')
+RE_THEORY   = re.compile(r'\b(model|mechanism|dual[\s-]?systems?|process model|expected value of control|valuation|control theory)\b')
+RE_VALIDITY = re.compile(r'\b(convergent|discriminant|criterion|predictive|known[- ]groups|response[- ]process|factor validity)\b')
+RE_RELIAB   = re.compile(r'\b(alpha|cronbach|omega|test[- ]?retest|icc)\b')
+RE_DESIGN   = re.compile(r'\b(randomi[sz]ed|experiment|intervention|longitudinal|cross[- ]sectional|pre[- ]post|rct)\b')
+RE_FUND     = re.compile(r'\bfund(ing|ed)|grant|sponsor|conflict of interest|coi\b')
+RE_ETHICS   = re.compile(r'\b(irb|ethic(al)? committee|approved|consent)\b')
+RE_AIMS     = re.compile(r'\b(aim|objective|we (aim|seek)|research question)\b')
+RE_SAMPLE   = re.compile(r'\b(sample|participants?|recruit|eligibility|inclusion|exclusion)\b')
+RE_CONFOUND = re.compile(r'\b(confound|control(?:s|led)?|covariate|adjust(ed|ment))\b')
+RE_STATS    = re.compile(r'\b(regression|anova|mixed[- ]effects|model|estimat|hypothesis test|assumption)\b')
+RE_PRECISION= re.compile(r'\b(effect size|confidence interval|ci|standard error|p\s*<)\b')
+RE_CONCLUDE = re.compile(r'\b(limit|caution|consistent with|cannot infer causality)\b')
+RE_FIT      = re.compile(r'\b(cfi|tli|rmsea|srmr|cfa|factor)\b')
+
+# subcomponent vocabulary across all constructs in the KB
+_SUBS = [s for cnode in KB["constructs"].values() for s in cnode["subcomponents"]]
+RE_SUBCOMP  = re.compile("|".join([re.escape(s.lower()) for s in _SUBS])) if _SUBS else re.compile(r'')
+
+# compiled once at import; scoring looks patterns up by name
+AXIS_PATTERNS = {
+    "aims": RE_AIMS,
+    "design": RE_DESIGN,
+    "sampling": RE_SAMPLE,
+    "validity": RE_VALIDITY,
+    "reliability": RE_RELIAB,
+    "confounding": RE_CONFOUND,
+    "stats": RE_STATS,
+    "precision": RE_PRECISION,
+    "conclusions": RE_CONCLUDE,
+    "funding": RE_FUND,
+    "ethics": RE_ETHICS,
+}
+CONSTRUCT_PATTERNS = {
+    "definition": RE_DEF,
+    "subcomponents": RE_SUBCOMP,
+    "theory": RE_THEORY,
+    "validity": RE_VALIDITY,
+    "fit": RE_FIT,
+}
 
 def find_hits(blob, pattern, maxn=6):
-    sents = sentences(blob)
-    out = [s for s in sents if pattern.search(s)]
-    return out[:maxn]
+    # one finditer sweep over the section; match offsets are mapped back to sentences.
+    # maxn=None collects every matching sentence.
+    low, starts, ends, sents = segment(blob)
+    idx = []
+    for m in pattern.finditer(low):
+        i = bisect_right(starts, m.start()) - 1
+        if i < 0 or m.start() >= ends[i] or (idx and idx[-1] == i):
+            continue
+        idx.append(i)
+        if len(idx) == maxn:
+            break
+    return [sents[i] for i in idx]
+
+def has_match(blob, pattern):
+    # boolean checks only need a search over the folded text, not a sentence split
+    return pattern.search(fold(blob)) is not None
+
+# ---------------- alias dictionary ----------------
+def _alias_table(kb):
+    # lowercased alias -> [(kind, construct/measure id, alias as written in the KB), ...]
+    owners = {}
+    for cname, cnode in kb["constructs"].items():
+        for lbl in cnode["canonical"] + cnode["neighbors"]:
+            owners.setdefault(lbl.lower(), []).append(("construct", cname, lbl))
+    for mid, mnode in kb["measures"].items():
+        for alias in mnode["aliases"]:
+            owners.setdefault(alias.lower(), []).append(("measure", mid, alias))
+    # longest first so that, of two aliases starting at the same offset, the longer one wins the alternation
+    return sorted(owners.items(), key=lambda kv: -len(kv[0]))
+
+_ALIASES = _alias_table(KB)
+ALIAS_KEYS = tuple(a for a, _ in _ALIASES)
+ALIAS_OWNERS = [o for _, o in _ALIASES]
+
+# Each matcher is built once per server process (st.cache_resource outlives reruns), and only
+# the one find_aliases uses: pyahocorasick when installed, else the regex alternation.
+@st.cache_resource(show_spinner=False)
+def alias_automaton(keys: Tuple[str, ...]):
+    auto = ahocorasick.Automaton()
+    for i, a in enumerate(keys):
+        auto.add_word(a, i)
+    auto.make_automaton()
+    return auto
+
+@st.cache_resource(show_spinner=False)
+def alias_regex(keys: Tuple[str, ...]):
+    # One lookahead alternation: every offset where any alias starts is reported, so overlapping
+    # aliases ("Brief Self-Control Scale" / "self-control") are all seen; group i+1 <-> keys[i].
+    # The leading first-character class lets the engine skip most offsets without trying the
+    # alternation. Also returns, per alias, the shorter aliases it starts with: at a shared
+    # offset the alternation reports only the longest (keys are sorted longest first).
+    first = "".join(sorted({a[0] for a in keys}))
+    pattern = re.compile(
+        r'\b(?=[' + re.escape(first) + '])(?=' + "|".join(rf'({re.escape(a)}\b)' for a in keys) + ')'
+    )
+    prefixes = [[j for j, b in enumerate(keys) if j != i and a.startswith(b)] for i, a in enumerate(keys)]
+    return pattern, prefixes
+
+def _is_word(ch):
+    return ch.isalnum() or ch == "_"
+
+def _word_edge(before, after):
+    # \b between two characters; "" stands for the start/end of the text
+    return (before != "" and _is_word(before)) != (after != "" and _is_word(after))
+
+def _boundary(blob, pos):
+    # equivalent of \b between blob[pos-1] and blob[pos]
+    return _word_edge(blob[pos-1:pos] if pos > 0 else "", blob[pos:pos+1])
+
+def _aliases_automaton(low):
+    found = set()
+    for end, i in alias_automaton(ALIAS_KEYS).iter(low):
+        start = end - len(ALIAS_KEYS[i]) + 1
+        if _boundary(low, start) and _boundary(low, end + 1):
+            found.update(ALIAS_OWNERS[i])
+    return found
+
+def _aliases_regex(low):
+    found = set()
+    pattern, prefixes = alias_regex(ALIAS_KEYS)
+    for m in pattern.finditer(low):
+        i = m.lastindex - 1
+        found.update(ALIAS_OWNERS[i])
+        for j in prefixes[i]:
+            if _boundary(low, m.start() + len(ALIAS_KEYS[j])):
+                found.update(ALIAS_OWNERS[j])
+    return found
+
+def find_aliases(blob):
+    # single pass over the blob; returns {(kind, id, alias), ...} for every alias present
+    if not ALIAS_KEYS:
+        return set()
+    low = fold(blob)
+    return _aliases_automaton(low) if ahocorasick is not None else _aliases_regex(low)
 
 def detect_construct_labels(blob):
+    present = find_aliases(blob)
     found = {}
     for cname, cnode in KB["constructs"].items():
         labels = cnode["canonical"] + cnode["neighbors"]
         for lbl in labels:
-            if re.search(rf'\b{re.escape(lbl)}\b', blob, re.I):
+            if ("construct", cname, lbl) in present:
                 found.setdefault(cname, set()).add(lbl)
     return {k: sorted(list(v)) for k,v in found.items()}
 
 def detect_measures(blob):
+    present = find_aliases(blob)
     hits = []
     for mid, mnode in KB["measures"].items():
         for alias in mnode["aliases"]:
-            if re.search(rf'\b{re.escape(alias)}\b', blob, re.I):
+            if ("measure", mid, alias) in present:
                 hits.append({"measure": mid, "alias": alias, "type": mnode["type"], "targets": mnode["targets"]})
                 break
     return hits
@@ -94,233 +316,341 @@ def map_targets(measures):
             buckets.setdefault(t, set()).add(m["measure"])
     return {k: sorted(list(v)) for k,v in buckets.items()}
 
-# ---------------- heuristics per item ----------------
-def propose_axis_score(item, sections) -> Dict:
-    # crude, transparent heuristics that you can override
-    sec_text = " ".join([sections.get(h,"") for h in item.get("section_hint",[])])
-    label = item["label"]
-
-    if "aims" in label.lower():
-        hits = find_hits(sec_text or sections.get("Full Text",""), re.compile(r'\b(aim|objective|we (aim|seek)|research question)\b', re.I))
-        score = "Yes" if hits else "Unclear"
-        return {"proposed": score, "evidence": hits}
-
-    if "design appropriate" in label.lower():
-        hits = find_hits(sec_text, RE_DESIGN)
-        score = "Yes" if hits else "Unclear"
-        return {"proposed": score, "evidence": hits}
-
-    if "sampling frame" in label.lower():
-        hits = find_hits(sec_text, re.compile(r'\b(sample|participants?|recruit|eligibility|inclusion|exclusion)\b', re.I))
-        return {"proposed": "Yes" if hits else "Unclear", "evidence": hits}
-
-    if "validity" in label.lower():
-        hits = find_hits(sec_text, RE_VALIDITY)
-        return {"proposed": "Yes" if hits else "Unclear", "evidence": hits}
-
-    if "reliability" in label.lower():
-        hits = find_hits(sec_text, RE_RELIAB)
-        return {"proposed": "Yes" if hits else "Unclear", "evidence": hits}
-
-    if "confounding" in label.lower():
-        hits = find_hits(sec_text, re.compile(r'\b(confound|control(?:s|led)?|covariate|adjust(ed|ment))\b', re.I))
-        return {"proposed": "Yes" if hits else "Unclear", "evidence": hits}
-
-    if "statistical methods" in label.lower():
-        hits = find_hits(sec_text, re.compile(r'\b(regression|ANOVA|mixed[- ]effects|model|estimat|hypothesis test|assumption)\b', re.I))
-        return {"proposed": "Yes" if hits else "Unclear", "evidence": hits}
-
-    if "precision" in label.lower():
-        hits = find_hits(sec_text, re.compile(r'\b(effect size|confidence interval|CI|standard error|p\s*<)\b', re.I))
-        return {"proposed": "Yes" if hits else "Unclear", "evidence": hits}
-
-    if "conclusions justified" in label.lower():
-        hits = find_hits(sec_text or sections.get("Discussion",""), re.compile(r'\b(limit|caution|consistent with|cannot infer causality)\b', re.I))
-        return {"proposed": "Yes" if hits else "Unclear", "evidence": hits}
-
-    if "funding" in label.lower():
-        hits = find_hits(sections.get("Funding","") + " " + sections.get("Acknowledgements",""), RE_FUND)
-        return {"proposed": "Yes" if hits else "Unclear", "evidence": hits}
-
-    if "ethical" in label.lower():
-        hits = find_hits(sections.get("Ethics","") + " " + sections.get("Method",""), RE_ETHICS)
-        return {"proposed": "Yes" if hits else "N/A", "evidence": hits}
-
-    # defaults
-    hits = find_hits(sec_text or sections.get("Full Text",""), re.compile(r'.'))
-    return {"proposed": "Unclear", "evidence": hits[:3]}
-
-def propose_construct_score(citem, sections, full):
-    hint = " ".join([sections.get(h,"") for h in citem.get("section_hint",[])]) or full
-
-    if "definition" in citem["label"].lower():
-        hits = find_hits(hint, RE_DEF)
-        return {"proposed": "Yes" if hits else "Unclear", "evidence": hits}
-
-    if "subcomponents" in citem["label"].lower():
-        # look for neighbor/subcomponent words
-        subs = []
-        for cname,cnode in KB["constructs"].items():
-            subs += cnode["subcomponents"]
-        pat = re.compile("|".join([re.escape(s) for s in subs]), re.I) if subs else re.compile(r'')
-        hits = find_hits(hint, pat)
-        return {"proposed": "Yes" if hits else "Unclear", "evidence": hits}
-
-    if "model/theory" in citem["label"].lower():
-        hits = find_hits(hint, RE_THEORY)
-        return {"proposed": "Yes" if hits else "Unclear", "evidence": hits}
-
-    if "measures align" in citem["label"].lower():
-        measures = detect_measures(full)
-        constructs = detect_construct_labels(full)
-        hits = [f"{m['alias']} → {', '.join(m['targets'])}" for m in measures]
-        score = "Yes" if measures else "No"
-        # crude jingle guard: SC + Grit
-        ops = {m["measure"] for m in measures}
-        warn = []
-        if "self-control" in constructs and "GritS" in ops:
-            warn.append("Jingle risk: SC label with Grit-S measure.")
-        return {"proposed": score, "evidence": hits, "warnings": warn}
-
-    if "jingle–jangle" in citem["label"].lower():
-        constructs = detect_construct_labels(full)
-        hits = [f"{k}: {v}" for k,v in constructs.items()]
-        # need boundary language
-        boundary_hit = bool(RE_BOUNDARY.search(full))
-        score = "Yes" if boundary_hit else ("Unclear" if constructs else "N/A")
-        return {"proposed": score, "evidence": hits}
-
-    if "evidence type supports" in citem["label"].lower():
-        has_valid = bool(find_hits(full, RE_VALIDITY))
-        has_fit   = bool(find_hits(full, re.compile(r'\b(CFI|TLI|RMSEA|SRMR|CFA|factor)\b', re.I)))
-        score = "Yes" if (has_valid or has_fit) else "Unclear"
-        ev = []
-        ev += find_hits(full, RE_VALIDITY, 3)
-        ev += find_hits(full, re.compile(r'\b(CFI|TLI|RMSEA|SRMR|CFA|factor)\b', re.I), 3)
-        return {"proposed": score, "evidence": ev}
+# ---------------- hit index ----------------
+# every pattern the scorers read from the hit index
+PATTERNS = {**AXIS_PATTERNS, **CONSTRUCT_PATTERNS}
+
+class HitIndex(dict):
+    # (section, pattern name) -> matching sentences. Filled on first lookup, so each pair is
+    # scanned at most once per paper however many items share it, and unused pairs never are.
+    def __init__(self, sections):
+        super().__init__()
+        self.texts = sections
+
+    def __missing__(self, key):
+        sname, pname = key
+        hits = self[key] = find_hits(self.texts.get(sname, ""), PATTERNS[pname], None)
+        return hits
+
+def lookup(index, scope, pname, maxn=6) -> List[str]:
+    # hits for one pattern across the sections in `scope`, in scope order
+    out = []
+    for sname in scope:
+        out += index[(sname, pname)]
+        if len(out) >= maxn:
+            break
+    return out[:maxn]
+
+def hinted(item, sections, fallback=()) -> List[str]:
+    # The item's section hints that this paper actually has. Fall back only when there is at
+    # most one hint and it is missing or empty; several missing hints give an empty scope.
+    hints = item.get("section_hint",[])
+    scope = [h for h in hints if sections.get(h)]
+    return scope if scope or len(hints) > 1 else list(fallback)
 
+# ---------------- heuristics per item ----------------
+# crude, transparent heuristics that you can override. Each item is classified once from its
+# label when the checklist is loaded; scoring then dispatches straight to the kind's handler.
+
+def _yes_if(hits, miss="Unclear"):
+    return {"proposed": "Yes" if hits else miss, "evidence": hits}
+
+def _score_aims(item, sections, index):
+    return _yes_if(lookup(index, hinted(item, sections, ["Full Text"]), "aims"))
+
+def _score_design(item, sections, index):
+    return _yes_if(lookup(index, hinted(item, sections), "design"))
+
+def _score_sampling(item, sections, index):
+    return _yes_if(lookup(index, hinted(item, sections), "sampling"))
+
+def _score_validity(item, sections, index):
+    return _yes_if(lookup(index, hinted(item, sections), "validity"))
+
+def _score_reliability(item, sections, index):
+    return _yes_if(lookup(index, hinted(item, sections), "reliability"))
+
+def _score_confounding(item, sections, index):
+    return _yes_if(lookup(index, hinted(item, sections), "confounding"))
+
+def _score_stats(item, sections, index):
+    return _yes_if(lookup(index, hinted(item, sections), "stats"))
+
+def _score_precision(item, sections, index):
+    return _yes_if(lookup(index, hinted(item, sections), "precision"))
+
+def _score_conclusions(item, sections, index):
+    return _yes_if(lookup(index, hinted(item, sections, ["Discussion"]), "conclusions"))
+
+def _score_funding(item, sections, index):
+    return _yes_if(lookup(index, ["Funding", "Acknowledgements"], "funding"))
+
+def _score_ethics(item, sections, index):
+    return _yes_if(lookup(index, ["Ethics", "Method"], "ethics"), miss="N/A")
+
+def _score_default(item, sections, index):
+    # no heuristic: show the opening sentences of the hinted sections
+    scope = hinted(item, sections, ["Full Text"])
+    sents = islice((s for h in scope for s in sentences(sections.get(h,""))), 3)
+    return {"proposed": "Unclear", "evidence": list(sents)}
+
+AXIS_HANDLERS = {
+    "aims": _score_aims,
+    "design": _score_design,
+    "sampling": _score_sampling,
+    "validity": _score_validity,
+    "reliability": _score_reliability,
+    "confounding": _score_confounding,
+    "stats": _score_stats,
+    "precision": _score_precision,
+    "conclusions": _score_conclusions,
+    "funding": _score_funding,
+    "ethics": _score_ethics,
+    "default": _score_default,
+}
+
+def _score_definition(citem, sections, full, index):
+    return _yes_if(lookup(index, hinted(citem, sections, ["Full Text"]), "definition"))
+
+def _score_subcomponents(citem, sections, full, index):
+    # look for neighbor/subcomponent words
+    return _yes_if(lookup(index, hinted(citem, sections, ["Full Text"]), "subcomponents"))
+
+def _score_theory(citem, sections, full, index):
+    return _yes_if(lookup(index, hinted(citem, sections, ["Full Text"]), "theory"))
+
+def _score_measures(citem, sections, full, index):
+    measures = detect_measures(full)
+    constructs = detect_construct_labels(full)
+    hits = [f"{m['alias']} → {', '.join(m['targets'])}" for m in measures]
+    score = "Yes" if measures else "No"
+    # crude jingle guard: SC + Grit
+    ops = {m["measure"] for m in measures}
+    warn = []
+    if "self-control" in constructs and "GritS" in ops:
+        warn.append("Jingle risk: SC label with Grit-S measure.")
+    return {"proposed": score, "evidence": hits, "warnings": warn}
+
+def _score_jingle(citem, sections, full, index):
+    constructs = detect_construct_labels(full)
+    hits = [f"{k}: {v}" for k,v in constructs.items()]
+    # need boundary language
+    boundary_hit = has_match(full, RE_BOUNDARY)
+    score = "Yes" if boundary_hit else ("Unclear" if constructs else "N/A")
+    return {"proposed": score, "evidence": hits}
+
+def _score_evidence_type(citem, sections, full, index):
+    ev = lookup(index, ["Full Text"], "validity", 3) + lookup(index, ["Full Text"], "fit", 3)
+    return {"proposed": "Yes" if ev else "Unclear", "evidence": ev}
+
+def _score_construct_default(citem, sections, full, index):
     return {"proposed": "Unclear", "evidence": []}
 
+CONSTRUCT_HANDLERS = {
+    "definition": _score_definition,
+    "subcomponents": _score_subcomponents,
+    "theory": _score_theory,
+    "measures": _score_measures,
+    "jingle": _score_jingle,
+    "evidence_type": _score_evidence_type,
+    "default": _score_construct_default,
+}
+
+# label keyword -> kind, checked in order (first match wins)
+AXIS_KINDS = [
+    ("aims", "aims"),
+    ("design appropriate", "design"),
+    ("sampling frame", "sampling"),
+    ("validity", "validity"),
+    ("reliability", "reliability"),
+    ("confounding", "confounding"),
+    ("statistical methods", "stats"),
+    ("precision", "precision"),
+    ("conclusions justified", "conclusions"),
+    ("funding", "funding"),
+    ("ethical", "ethics"),
+]
+CONSTRUCT_KINDS = [
+    ("definition", "definition"),
+    ("subcomponents", "subcomponents"),
+    ("model/theory", "theory"),
+    ("measures align", "measures"),
+    ("jingle–jangle", "jingle"),
+    ("evidence type supports", "evidence_type"),
+]
+
+def classify(label, kinds):
+    low = label.lower()
+    return next((kind for key, kind in kinds if key in low), "default")
+
+for _item in AXIS["axis_items"]:
+    _item["_kind"] = classify(_item["label"], AXIS_KINDS)
+for _item in AXIS["construct_addendum"]:
+    _item["_kind"] = classify(_item["label"], CONSTRUCT_KINDS)
+
+def propose_axis_score(item, sections, index) -> Dict:
+    return AXIS_HANDLERS[item["_kind"]](item, sections, index)
+
+def propose_construct_score(citem, sections, full, index):
+    return CONSTRUCT_HANDLERS[citem["_kind"]](citem, sections, full, index)
+
+# ---------------- analysis ----------------
+def to_columns(items, proposals) -> Dict[str, List]:
+    # struct-of-arrays: one list per field, all indexed by the item's position in the checklist
+    return {
+        "id": [it["id"] for it in items],
+        "label": [it["label"] for it in items],
+        "guidance": [it["guidance"] for it in items],
+        "proposed": [p["proposed"] for p in proposals],
+        "evidence": [p["evidence"] for p in proposals],
+        "warnings": [p.get("warnings", []) for p in proposals],
+    }
+
+SURROGATES = re.compile('[\ud800-\udfff]')
+
+CACHED_PAPERS = 16  # per-paper cache entries kept; the least recently used paper is evicted first
+
+@st.cache_data(show_spinner=False, max_entries=CACHED_PAPERS)
+def parse_paper(digest: str, _pdf_bytes: bytes) -> Dict[str, str]:
+    # keyed on the upload's digest: widget reruns reuse the extracted, normalized sections.
+    # Lone surrogates (pypdf can decode with surrogateescape) become U+FFFD here, once, so the
+    # text encodes to UTF-8; one character for one keeps offsets and sentence ends as they were.
+    text = SURROGATES.sub("\ufffd", extract_text(_pdf_bytes))
+    return {k: normalize(v) for k,v in sectionize(text).items()}
+
+# Each checklist is scored when its tab first opens and cached per paper. Arguments with a
+# leading underscore are not hashed; the upload's digest is the key.
+@st.cache_data(show_spinner="Scoring AXIS items…", max_entries=CACHED_PAPERS)
+def build_axis_proposals(digest: str, _secs: Dict[str, str]) -> Dict[str, List]:
+    index = HitIndex(_secs)
+    return to_columns(AXIS["axis_items"], [propose_axis_score(item, _secs, index) for item in AXIS["axis_items"]])
+
+@st.cache_data(show_spinner="Scoring construct items…", max_entries=CACHED_PAPERS)
+def build_construct_proposals(digest: str, _secs: Dict[str, str]) -> Dict[str, List]:
+    items = AXIS["construct_addendum"]
+    index = HitIndex(_secs)
+    return to_columns(items, [propose_construct_score(citem, _secs, _secs["Full Text"], index) for citem in items])
+
 # ---------------- UI ----------------
+SCORES = ["Yes","No","Unclear","N/A"]
+
+def initial_score(proposed):
+    # the reviewer's score starts at the proposal; anything off the scale starts at "Unclear"
+    return proposed if proposed in SCORES else "Unclear"
+
 uploaded = st.file_uploader("📄 Upload a PDF article", type=["pdf"])
 
 if uploaded:
-    with st.spinner("Parsing & scanning…"):
-        blob = extract_text(uploaded)
-        secs = sectionize(blob)
-
-        # AXIS proposal
-        axis_proposals = []
-        for item in AXIS["axis_items"]:
-            axis_proposals.append({
-                "id": item["id"],
-                "label": item["label"],
-                "guidance": item["guidance"],
-                "proposal": propose_axis_score(item, secs)
-            })
-
-        # Construct addendum proposal
-        add_proposals = []
-        for citem in AXIS["construct_addendum"]:
-            add_proposals.append({
-                "id": citem["id"],
-                "label": citem["label"],
-                "guidance": citem["guidance"],
-                "proposal": propose_construct_score(citem, secs, blob)
-            })
-
-    st.success("✅ Draft appraisal ready")
-
-    # Tabs
-    t1, t2, t3 = st.tabs(["AXIS checklist", "Construct addendum (SC/SRL)", "Export"])
-
-    with t1:
-        st.caption("Click each item to review the proposed score and evidence, then confirm or override.")
-        axis_scores = {}
-        for row in axis_proposals:
-            with st.expander(f"[{row['id']}] {row['label']}"):
-                st.write("**Guidance:**", row["guidance"])
-                st.write("**Proposed:**", row["proposal"]["proposed"])
-                st.write("**Evidence:**")
-                for s in row["proposal"]["evidence"]:
-                    st.write("•", s)
-                axis_scores[row["id"]] = st.selectbox(
-                    "Your score",
-                    ["Yes","No","Unclear","N/A"],
-                    index=["Yes","No","Unclear","N/A"].index(row["proposal"]["proposed"]) if row["proposal"]["proposed"] in ["Yes","No","Unclear","N/A"] else 2,
-                    key=f"axis_{row['id']}"
-                )
-                st.text_area("Rationale/comments", key=f"axis_c_{row['id']}", placeholder="Why this score? Cite lines, note limitations…")
-
-    with t2:
-        add_scores = {}
-        for row in add_proposals:
-            with st.expander(f"[{row['id']}] {row['label']}"):
-                st.write("**Guidance:**", row["guidance"])
-                st.write("**Proposed:**", row["proposal"]["proposed"])
-                if "warnings" in row["proposal"] and row["proposal"]["warnings"]:
-                    for w in row["proposal"]["warnings"]:
+    pdf_bytes = uploaded.getvalue()
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+    with st.spinner("Parsing…"):
+        secs = parse_paper(digest, pdf_bytes)
+
+    st.success("✅ Paper parsed — each checklist is scored when its tab opens")
+
+    # Scores and comments live under axis_*/add_* keys. A new paper starts from its own
+    # proposals. Otherwise the values are written back every run: only the open tab renders
+    # its widgets, and Streamlit drops the state of widgets that were not rendered.
+    choices = [k for k in st.session_state if k.startswith(("axis_", "add_"))]
+    if st.session_state.get("paper_digest") != digest:
+        for k in choices:
+            del st.session_state[k]
+        st.session_state["paper_digest"] = digest
+    else:
+        for k in choices:
+            st.session_state[k] = st.session_state[k]
+
+    # Tabs: on_change="rerun" makes them stateful, so only the open tab's body runs
+    t1, t2, t3 = st.tabs(["AXIS checklist", "Construct addendum (SC/SRL)", "Export"], key="tab", on_change="rerun")
+
+    if t1.open:
+        with t1:
+            axis = build_axis_proposals(digest, secs)
+            st.caption("Click each item to review the proposed score and evidence, then confirm or override.")
+            axis_scores = {}
+            for i, iid in enumerate(axis["id"]):
+                with st.expander(f"[{iid}] {axis['label'][i]}"):
+                    st.write("**Guidance:**", axis["guidance"][i])
+                    st.write("**Proposed:**", axis["proposed"][i])
+                    st.write("**Evidence:**")
+                    for s in axis["evidence"][i]:
+                        st.write("•", s)
+                    st.session_state.setdefault(f"axis_{iid}", initial_score(axis["proposed"][i]))
+                    axis_scores[iid] = st.selectbox("Your score", SCORES, key=f"axis_{iid}")
+                    st.text_area("Rationale/comments", key=f"axis_c_{iid}", placeholder="Why this score? Cite lines, note limitations…")
+
+    if t2.open:
+        with t2:
+            add = build_construct_proposals(digest, secs)
+            add_scores = {}
+            for i, iid in enumerate(add["id"]):
+                with st.expander(f"[{iid}] {add['label'][i]}"):
+                    st.write("**Guidance:**", add["guidance"][i])
+                    st.write("**Proposed:**", add["proposed"][i])
+                    for w in add["warnings"][i]:
                         st.warning(w)
-                st.write("**Evidence:**")
-                for s in row["proposal"]["evidence"]:
-                    st.write("•", s)
-                add_scores[row["id"]] = st.selectbox(
-                    "Your score",
-                    ["Yes","No","Unclear","N/A"],
-                    index=["Yes","No","Unclear","N/A"].index(row["proposal"]["proposed"]) if row["proposal"]["proposed"] in ["Yes","No","Unclear","N/A"] else 2,
-                    key=f"add_{row['id']}"
+                    st.write("**Evidence:**")
+                    for s in add["evidence"][i]:
+                        st.write("•", s)
+                    st.session_state.setdefault(f"add_{iid}", initial_score(add["proposed"][i]))
+                    add_scores[iid] = st.selectbox("Your score", SCORES, key=f"add_{iid}")
+                    st.text_area("Rationale/comments", key=f"add_c_{iid}", placeholder="Why this score? Evidence?")
+
+    if t3.open:
+        with t3:
+            if st.button("Build exportable report"):
+                # a checklist whose tab was never opened is scored here and exported at its proposals
+                axis = build_axis_proposals(digest, secs)
+                add = build_construct_proposals(digest, secs)
+                export = {
+                    "axis": [
+                        {
+                            "id": iid,
+                            "label": label,
+                            "proposed": proposed,
+                            "final": st.session_state.get(f"axis_{iid}", initial_score(proposed)),
+                            "comments": st.session_state.get(f"axis_c_{iid}", ""),
+                            "evidence": evidence
+                        } for iid, label, proposed, evidence in zip(axis["id"], axis["label"], axis["proposed"], axis["evidence"])
+                    ],
+                    "construct_addendum": [
+                        {
+                            "id": iid,
+                            "label": label,
+                            "proposed": proposed,
+                            "final": st.session_state.get(f"add_{iid}", initial_score(proposed)),
+                            "comments": st.session_state.get(f"add_c_{iid}", ""),
+                            "evidence": evidence,
+                            "warnings": warnings
+                        } for iid, label, proposed, evidence, warnings in zip(add["id"], add["label"], add["proposed"], add["evidence"], add["warnings"])
+                    ]
+                }
+                # serialized once, shown and downloaded as the same bytes
+                report = dump_json(export)
+                st.subheader("Report (JSON)")
+                st.code(report.decode("utf-8"), language="json")
+                st.download_button(
+                    "⬇️ Download JSON",
+                    data=report,
+                    file_name="axis_construct_appraisal.json",
+                    mime="application/json"
+                )
+                # Lightweight Markdown export
+                md_lines = ["# AXIS Appraisal + Construct Addendum\n"]
+                md_lines.append("## AXIS checklist")
+                for r in export["axis"]:
+                    md_lines.append(f"- **[{r['id']}] {r['label']}** — Final: {r['final']} (Proposed: {r['proposed']})")
+                    if r["comments"]: md_lines.append(f"  - _Comments:_ {r['comments']}")
+                md_lines.append("\n## Construct addendum (Self-Control / Self-Regulation)")
+                for r in export["construct_addendum"]:
+                    md_lines.append(f"- **[{r['id']}] {r['label']}** — Final: {r['final']} (Proposed: {r['proposed']})")
+                    if r["warnings"]:
+                        for w in r["warnings"]: md_lines.append(f"  - ⚠️ {w}")
+                    if r["comments"]: md_lines.append(f"  - _Comments:_ {r['comments']}")
+                md = "\n".join(md_lines)
+                st.download_button(
+                    "⬇️ Download Markdown",
+                    data=md.encode("utf-8"),
+                    file_name="axis_construct_appraisal.md",
+                    mime="text/markdown"
                 )
-                st.text_area("Rationale/comments", key=f"add_c_{row['id']}", placeholder="Why this score? Evidence?")
-
-    with t3:
-        if st.button("Build exportable report"):
-            export = {
-                "axis": [
-                    {
-                        "id": r["id"],
-                        "label": r["label"],
-                        "proposed": r["proposal"]["proposed"],
-                        "final": st.session_state.get(f"axis_{r['id']}"),
-                        "comments": st.session_state.get(f"axis_c_{r['id']}", ""),
-                        "evidence": r["proposal"]["evidence"]
-                    } for r in axis_proposals
-                ],
-                "construct_addendum": [
-                    {
-                        "id": r["id"],
-                        "label": r["label"],
-                        "proposed": r["proposal"]["proposed"],
-                        "final": st.session_state.get(f"add_{r['id']}"),
-                        "comments": st.session_state.get(f"add_c_{r['id']}", ""),
-                        "evidence": r["proposal"]["evidence"],
-                        "warnings": r["proposal"].get("warnings", [])
-                    } for r in add_proposals
-                ]
-            }
-            st.subheader("Report (JSON)")
-            st.json(export)
-            st.download_button(
-                "⬇️ Download JSON",
-                data=json.dumps(export, indent=2).encode("utf-8"),
-                file_name="axis_construct_appraisal.json",
-                mime="application/json"
-            )
-            # Lightweight Markdown export
-            md_lines = ["# AXIS Appraisal + Construct Addendum\n"]
-            md_lines.append("## AXIS checklist")
-            for r in export["axis"]:
-                md_lines.append(f"- **[{r['id']}] {r['label']}** — Final: {r['final']} (Proposed: {r['proposed']})")
-                if r["comments"]: md_lines.append(f"  - _Comments:_ {r['comments']}")
-            md_lines.append("\n## Construct addendum (Self-Control / Self-Regulation)")
-            for r in export["construct_addendum"]:
-                md_lines.append(f"- **[{r['id']}] {r['label']}** — Final: {r['final']} (Proposed: {r['proposed']})")
-                if r["warnings"]:
-                    for w in r["warnings"]: md_lines.append(f"  - ⚠️ {w}")
-                if r["comments"]: md_lines.append(f"  - _Comments:_ {r['comments']}")
-            md = "\n".join(md_lines)
-            st.download_button(
-                "⬇️ Download Markdown",
-                data=md.encode("utf-8"),
-                file_name="axis_construct_appraisal.md",
-                mime="text/markdown"
-            )
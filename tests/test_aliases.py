@@ -0,0 +1,54 @@
+"""Both alias matchers agree with a per-alias \\b search on random text.
+
+Run from the repository root: python -m unittest discover tests
+"""
+import os
+import random
+import re
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # the app loads axis.yaml and constructs.yaml from the working directory
+
+import axis_app  # noqa: E402
+
+# alias fragments, case variants and neighbours that do or do not make a word boundary
+FILLERS = ["x", " ", "-", "13", "scale", "self", "SELF-CONTROL", "BSCS", "é", "_", "/", "go", "(", ".", "\udc9d"]
+JOINERS = ["", " ", "", "-"]
+
+
+def expected(text):
+    # what the scorers used to do: one case-sensitive \b search per alias over the folded text
+    low = axis_app.fold(text)
+    return {owner
+            for key, owners in zip(axis_app.ALIAS_KEYS, axis_app.ALIAS_OWNERS)
+            if re.search(rf"\b{re.escape(key)}\b", low)
+            for owner in owners}
+
+
+class AliasMatcherTest(unittest.TestCase):
+    def random_texts(self, n):
+        rng = random.Random(2)
+        pieces = list(axis_app.ALIAS_KEYS) + [k.upper() for k in axis_app.ALIAS_KEYS[:5]] + FILLERS
+        for _ in range(n):
+            yield "".join(rng.choice(pieces) + rng.choice(JOINERS) for _ in range(rng.randint(0, 8)))
+
+    @unittest.skipIf(axis_app.ahocorasick is None, "pyahocorasick is not installed")
+    def test_automaton_matches_reference(self):
+        for text in self.random_texts(5000):
+            self.assertEqual(axis_app._aliases_automaton(axis_app.fold(text)), expected(text), repr(text))
+
+    def test_regex_fallback_matches_reference(self):
+        for text in self.random_texts(5000):
+            self.assertEqual(axis_app._aliases_regex(axis_app.fold(text)), expected(text), repr(text))
+
+    def test_overlapping_aliases_are_all_found(self):
+        found = axis_app.find_aliases("The Brief Self-Control Scale (BSCS) measured self-control.")
+        self.assertIn(("measure", "BSCS", "Brief Self-Control Scale"), found)
+        self.assertIn(("construct", "self-control", "self-control"), found)
+
+
+if __name__ == "__main__":
+    unittest.main()
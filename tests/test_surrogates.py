@@ -0,0 +1,57 @@
+"""A paper whose extracted text carries lone surrogates scores and exports end to end.
+
+Run from the repository root: python -m unittest discover tests
+"""
+import hashlib
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # the app loads axis.yaml and constructs.yaml from the working directory
+
+import axis_app  # noqa: E402
+
+# what pypdf can hand back for undecodable bytes (surrogateescape)
+SURROGATE_TEXT = (
+    "Abstract\nWe aim to examine self-control \udc9d in students.\n"
+    "Method\nParticipants were recruited from schools \udcff. Convergent validity was examined.\n"
+    "Results\nRegression models showed an effect (95% confidence interval .1-.3). CFI was .95.\n"
+    "Discussion\nSelf-control is distinct from grit \ud800. Results are consistent with theory.\n"
+)
+
+
+class SurrogateUploadTest(unittest.TestCase):
+    def test_upload_scores_and_exports(self):
+        pdf_bytes = b"%PDF- surrogate fixture"
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        with mock.patch.object(axis_app, "extract_text", return_value=SURROGATE_TEXT):
+            secs = axis_app.parse_paper(digest, pdf_bytes)
+        axis = axis_app.build_axis_proposals(digest, secs)
+        add = axis_app.build_construct_proposals(digest, secs)
+
+        self.assertEqual(len(axis["id"]), len(axis_app.AXIS["axis_items"]))
+        self.assertEqual(len(add["id"]), len(axis_app.AXIS["construct_addendum"]))
+        aims = axis["id"].index("A1")
+        self.assertEqual(axis["proposed"][aims], "Yes")
+        # the surrogate becomes U+FFFD and the sentence stays whole
+        self.assertIn("Abstract We aim to examine self-control \ufffd in students.", axis["evidence"][aims])
+
+        report = json.loads(axis_app.dump_json({"axis": axis, "construct_addendum": add}))
+        self.assertEqual(report["axis"]["evidence"][aims], axis["evidence"][aims])
+
+    def test_alias_scan_reads_surrogates_as_non_word(self):
+        text = "Self-control\udc9d and grit \ud800 (BSCS) with the Grit-S\udcff."
+        self.assertEqual(axis_app.detect_construct_labels(text)["self-control"], ["grit", "self-control"])
+        self.assertEqual([m["alias"] for m in axis_app.detect_measures(text)], ["BSCS", "Grit-S"])
+
+    def test_export_escapes_surrogates(self):
+        export = {"axis": [{"id": "A1", "evidence": ["We aim \udc9d to test."]}]}
+        self.assertEqual(json.loads(axis_app.dump_json(export)), export)
+
+
+if __name__ == "__main__":
+    unittest.main()